@@ -1,51 +1,356 @@
-from flask import Flask, jsonify, request, render_template, redirect, url_for, flash
+import hashlib
+import os
+import re
+import sqlite3
+from functools import wraps
+
+import orjson
+from flask import Flask, request, render_template, redirect, url_for, flash
+from flask import make_response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import bindparam, column, event, table, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.orm import selectinload
 from flask_cors import CORS
 
 app = Flask(__name__)
 CORS(app)
 
 # Configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///bookmarks.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///bookmarks.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Keep SQLite connections open between requests so their page cache stays warm
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'poolclass': QueuePool,
+    'pool_size': 10,
+    'max_overflow': 5,
+    'connect_args': {'check_same_thread': False, 'timeout': 30}
+}
 app.config['SECRET_KEY'] = 'your-secret-key-here'  # Needed for flash messages
 
 db = SQLAlchemy(app)
 
 
-# Database Model
+# Tune every new SQLite connection: WAL so readers don't block on writers,
+# and a larger in-memory page cache so repeat queries skip disk reads
+@event.listens_for(Engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.close()
+
+
+# Database Models
+tag_assoc = db.Table(
+    'bookmark_tag',
+    db.Column('bookmark_id', db.Integer, db.ForeignKey('bookmark.id'), primary_key=True),
+    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id'), primary_key=True),
+    db.Index('ix_bookmark_tag_tag_id', 'tag_id')
+)
+
+
+class Tag(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100, collation='NOCASE'), unique=True, nullable=False)
+
+
 class Bookmark(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     url = db.Column(db.String(500), nullable=False)
     title = db.Column(db.String(200), nullable=False)
+    # Comma-separated copy of the tag names, used for full-text search
     tags = db.Column(db.String(200), default='')
+    # The same names as a JSON array; every read path serializes tags from here
+    tags_json = db.Column(db.Text, nullable=False, server_default='[]')
+    tag_objects = db.relationship('Tag', secondary=tag_assoc)
 
     def to_dict(self):
         return {
             "id": self.id,
             "url": self.url,
             "title": self.title,
-            "tags": self.tags.split(',') if self.tags else []
+            "tags": orjson.loads(self.tags_json)
         }
 
 
+# Full-text index over bookmarks, kept in sync with the bookmark table by triggers
+FTS_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS bookmarks_fts USING fts5(
+        title, url, tags, content='bookmark', content_rowid='id', tokenize='unicode61')""",
+    """CREATE TRIGGER IF NOT EXISTS bookmarks_ai AFTER INSERT ON bookmark BEGIN
+        INSERT INTO bookmarks_fts(rowid, title, url, tags)
+        VALUES (new.id, new.title, new.url, new.tags);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS bookmarks_ad AFTER DELETE ON bookmark BEGIN
+        INSERT INTO bookmarks_fts(bookmarks_fts, rowid, title, url, tags)
+        VALUES ('delete', old.id, old.title, old.url, old.tags);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS bookmarks_au AFTER UPDATE ON bookmark BEGIN
+        INSERT INTO bookmarks_fts(bookmarks_fts, rowid, title, url, tags)
+        VALUES ('delete', old.id, old.title, old.url, old.tags);
+        INSERT INTO bookmarks_fts(rowid, title, url, tags)
+        VALUES (new.id, new.title, new.url, new.tags);
+    END""",
+]
+
+# Counter bumped by triggers on every bookmark write. It lives in the database
+# so every worker process sees the same value
+VERSION_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS bookmark_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)""",
+    "INSERT OR IGNORE INTO bookmark_version (id, version) VALUES (1, 0)",
+    """CREATE TRIGGER IF NOT EXISTS bookmark_version_ai AFTER INSERT ON bookmark BEGIN
+        UPDATE bookmark_version SET version = version + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS bookmark_version_ad AFTER DELETE ON bookmark BEGIN
+        UPDATE bookmark_version SET version = version + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS bookmark_version_au AFTER UPDATE ON bookmark BEGIN
+        UPDATE bookmark_version SET version = version + 1;
+    END""",
+]
+
+DATA_VERSION_SQL = text("SELECT version FROM bookmark_version WHERE id = 1")
+
+bookmarks_fts = table('bookmarks_fts', column('rowid'))
+
+# Builds one page of bookmarks as a JSON object inside SQLite; "next" is the
+# after_id for the following page, or null once the last page is reached
+BOOKMARKS_PAGE_JSON_SQL = text(
+    "SELECT json_object("
+    "'items', json_group_array(json_object("
+    "'id', id, 'url', url, 'title', title, 'tags', json(tags_json))), "
+    "'next', CASE WHEN count(*) = :limit THEN max(id) END) "
+    "FROM (SELECT id, url, title, tags_json FROM bookmark "
+    "WHERE id > :after_id ORDER BY id LIMIT :limit)"
+)
+
+# Largest value SQLite can bind as an INTEGER
+MAX_SQLITE_INTEGER = 2 ** 63 - 1
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+STREAM_BATCH_SIZE = 500
+
+# Counts each tag straight from the join table
+TAG_COUNTS_SQL = text(
+    "SELECT tag.name AS name, COUNT(*) AS count FROM bookmark_tag "
+    "JOIN tag ON tag.id = bookmark_tag.tag_id "
+    "GROUP BY tag.id "
+    "ORDER BY count DESC, name"
+)
+
+
+# Helper function to trim tag names and drop empty or repeated ones.
+# Names are stored cleaned so readers never need to strip them
+def clean_tag_names(names):
+    unique_names = {}
+    for name in names:
+        name = name.strip()
+        if name:
+            unique_names.setdefault(name.lower(), name)
+    return list(unique_names.values())
+
+
+# Helper function to look up Tag rows by (cleaned) name, adding missing ones.
+# Missing names are inserted with ON CONFLICT DO NOTHING, so two requests that
+# create the same tag at once both succeed, and then everything is re-selected
+def get_or_create_tags(names):
+    tags = {}
+    if names:
+        db.session.execute(
+            sqlite_insert(Tag.__table__).on_conflict_do_nothing(index_elements=['name']),
+            [{"name": name} for name in names]
+        )
+        for tag in Tag.query.filter(Tag.name.in_(names)):
+            tags[tag.name.lower()] = tag
+    return tags
+
+
+# Helper function to point a bookmark at its Tag rows, creating missing ones.
+# The stored names use the existing Tag spelling, so all three copies agree
+def set_bookmark_tags(bookmark, names):
+    names = clean_tag_names(names)
+    tags = get_or_create_tags(names)
+    names = [tags[name.lower()].name for name in names]
+    bookmark.tags = ','.join(names)
+    bookmark.tags_json = orjson.dumps(names).decode()
+    bookmark.tag_objects = [tags[name.lower()] for name in names]
+
+
 # Create tables
 with app.app_context():
     db.create_all()
+    with db.engine.begin() as conn:
+        columns = [row[1] for row in conn.execute(text("PRAGMA table_info(bookmark)"))]
+        if 'tags_json' not in columns:
+            # Databases created before tags_json existed get the column added and filled
+            conn.execute(text("ALTER TABLE bookmark ADD COLUMN tags_json TEXT NOT NULL DEFAULT '[]'"))
+            rows = conn.execute(text("SELECT id, tags FROM bookmark WHERE tags != ''")).all()
+            if rows:
+                conn.execute(
+                    text("UPDATE bookmark SET tags_json = :tags_json WHERE id = :id"),
+                    [{"id": id_, "tags_json": orjson.dumps(tags.split(',')).decode()}
+                     for id_, tags in rows]
+                )
+
+        fts_exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'bookmarks_fts'")
+        ).first()
+        for statement in FTS_SCHEMA:
+            conn.execute(text(statement))
+        if not fts_exists:
+            # Index the bookmarks that were stored before the FTS table existed
+            conn.execute(text("INSERT INTO bookmarks_fts(bookmarks_fts) VALUES ('rebuild')"))
+
+        for statement in VERSION_SCHEMA:
+            conn.execute(text(statement))
+
+    # Fill the join table for bookmarks that only have the comma-separated tags
+    if db.session.query(tag_assoc).first() is None:
+        bookmarks = (Bookmark.query
+                     .options(selectinload(Bookmark.tag_objects))
+                     .filter(Bookmark.tags != '')
+                     .all())
+        for bookmark in bookmarks:
+            set_bookmark_tags(bookmark, bookmark.tags.split(','))
+            db.session.flush()
+        db.session.commit()
+
+    # Refresh the planner statistics on every start, so a search that filters by
+    # tag and text can weigh the bookmark_tag index against the FTS lookup.
+    # analysis_limit samples each index, which keeps this cheap on large tables
+    with db.engine.begin() as conn:
+        conn.execute(text("PRAGMA analysis_limit=400"))
+        conn.execute(text("ANALYZE"))
+
+
+# Helper function to build a JSON response with orjson instead of the stdlib encoder
+def ojsonify(obj, status=200):
+    return app.response_class(orjson.dumps(obj), status=status, mimetype='application/json')
+
+
+# Columns that make up a serialized bookmark, for reads that skip the ORM objects
+BOOKMARK_COLUMNS = (Bookmark.id, Bookmark.url, Bookmark.title, Bookmark.tags_json)
+
+
+# Helper function to build the search statement for one combination of filters;
+# the filter values are left as bound parameters
+def build_search_statement(with_tag, with_match):
+    statement = db.select(*BOOKMARK_COLUMNS).execution_options(yield_per=STREAM_BATCH_SIZE)
+    if with_tag:
+        statement = (statement.join(Bookmark.tag_objects)
+                     .where(Tag.name == bindparam('tag')))
+    if with_match:
+        statement = (statement.join(bookmarks_fts, bookmarks_fts.c.rowid == Bookmark.id)
+                     .where(text('bookmarks_fts MATCH :q'))
+                     .order_by(text('bm25(bookmarks_fts)')))
+    return statement
+
+
+# Every search statement is built once at import, keyed by (has tag, has MATCH)
+SEARCH_STATEMENTS = {
+    (with_tag, with_match): build_search_statement(with_tag, with_match)
+    for with_tag in (False, True)
+    for with_match in (False, True)
+}
+
+
+# Helper function to serialize plain result rows the same way as Bookmark.to_dict.
+# Rows are unpacked positionally (see BOOKMARK_COLUMNS), which avoids a named
+# attribute lookup per field on every row
+def rows_to_dicts(rows):
+    return [{
+        "id": id_,
+        "url": url,
+        "title": title,
+        "tags": orjson.loads(tags_json)
+    } for id_, url, title, tags_json in rows]
+
+
+# Helper function to read the current bookmark data version
+def get_data_version():
+    return db.session.execute(DATA_VERSION_SQL).scalar()
+
+
+# Helper function to build the ETag for the current request: the data version
+# plus a short hash of the path and query string, so each URL gets its own validator
+def request_etag():
+    url_hash = hashlib.blake2s(request.full_path.encode(), digest_size=6).hexdigest()
+    return f'{get_data_version()}-{url_hash}'
+
+
+# Decorator for GET endpoints: tag the response with a weak ETag and answer
+# 304 Not Modified when the client already has it. Error responses are never tagged
+def conditional_on_data_version(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        etag = request_etag()
+        if request.if_none_match.contains_weak(etag):
+            response = app.response_class(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag, weak=True)
+        return response
+    return wrapper
+
+
+# Tag counts and the /api/tags body only change when bookmarks are written, so
+# they are kept in memory as one (version, tags, body) entry and rebuilt once the
+# data version moves on
+_TAGS_CACHE = {'entry': None}
+
+
+def _tags_cache_entry():
+    version = get_data_version()
+    entry = _TAGS_CACHE['entry']
+    if entry is None or entry[0] != version:
+        rows = db.session.execute(TAG_COUNTS_SQL).fetchall()
+        tags = [{"name": name, "count": count} for name, count in rows]
+        body = orjson.dumps({
+            "total_tags": len(tags),
+            "tags": tags
+        })
+        entry = (version, tags, body)
+        _TAGS_CACHE['entry'] = entry
+    return entry
 
 
 # Helper function to get tags with counts
 def get_tags_with_counts():
-    bookmarks = Bookmark.query.all()
-    tag_count = {}
-    for bookmark in bookmarks:
-        if bookmark.tags:
-            for tag in bookmark.tags.split(','):
-                tag = tag.strip()
-                if tag:
-                    tag_count[tag] = tag_count.get(tag, 0) + 1
-    sorted_tags = sorted(tag_count.items(), key=lambda x: x[1], reverse=True)
-    return [{"name": tag, "count": count} for tag, count in sorted_tags]
+    return _tags_cache_entry()[1]
+
+
+# Helper function to turn user input into quoted FTS5 terms, so characters
+# like '-' or words like 'OR' are never parsed as query operators
+def fts_terms(value, prefix=False):
+    suffix = '*' if prefix else ''
+    return [f'"{token}"{suffix}' for token in re.findall(r'\w+', value)]
+
+
+# Helper function to build the MATCH expression for the search filters
+def build_fts_query(title=None, q=None):
+    clauses = []
+    if title:
+        terms = fts_terms(title, prefix=True)
+        if not terms:
+            return None
+        clauses.append('title : ({})'.format(' '.join(terms)))
+    if q:
+        terms = fts_terms(q, prefix=True)
+        if not terms:
+            return None
+        clauses.append(' '.join(terms))
+    return ' AND '.join(clauses)
 
 
 # ============ HTML PAGES ============
@@ -53,105 +358,176 @@ def get_tags_with_counts():
 # ============ FULL JSON API ============
 
 @app.route('/api/bookmarks', methods=['GET'])
+@conditional_on_data_version
 def api_get_bookmarks():
-    bookmarks = Bookmark.query.all()
-    return jsonify([b.to_dict() for b in bookmarks])
+    after_id = request.args.get('after_id', 0, type=int)
+    after_id = min(max(after_id, 0), MAX_SQLITE_INTEGER)
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+
+    body = db.session.execute(
+        BOOKMARKS_PAGE_JSON_SQL, {"after_id": after_id, "limit": limit}
+    ).scalar()
+    return app.response_class(body, mimetype='application/json')
 
 
 @app.route('/api/bookmarks/<int:bookmark_id>', methods=['GET'])
+@conditional_on_data_version
 def api_get_bookmark(bookmark_id):
-    bookmark = Bookmark.query.get(bookmark_id)
+    bookmark = db.session.get(Bookmark, bookmark_id)
     if not bookmark:
-        return jsonify({"error": "Not found"}), 404
-    return jsonify(bookmark.to_dict())
+        return ojsonify({"error": "Not found"}), 404
+    return ojsonify(bookmark.to_dict())
+
+
+# Helper function to check a bookmark from a request body; returns an error
+# message, or None when it is valid. With partial (updates) fields may be left out
+def bookmark_input_error(data, partial=False):
+    if not isinstance(data, dict):
+        return "a bookmark object is required"
+    for field in ('url', 'title'):
+        if partial and field not in data:
+            continue
+        if not data.get(field):
+            return "url and title are required"
+        if not isinstance(data[field], str):
+            return "url and title must be strings"
+    tags = data.get('tags', [])
+    if not isinstance(tags, list) or not all(isinstance(name, str) for name in tags):
+        return "tags must be a list of strings"
+    return None
 
 
 @app.route('/api/bookmarks', methods=['POST'])
 def api_add_bookmark():
     data = request.get_json()
-    if not data.get('url') or not data.get('title'):
-        return jsonify({"error": "url and title are required"}), 400
+    error = bookmark_input_error(data)
+    if error:
+        return ojsonify({"error": error}), 400
 
     bookmark = Bookmark(
         url=data.get('url'),
-        title=data.get('title'),
-        tags=','.join(data.get('tags', []))
+        title=data.get('title')
     )
+    set_bookmark_tags(bookmark, data.get('tags', []))
     db.session.add(bookmark)
     db.session.commit()
-    return jsonify(bookmark.to_dict()), 201
+    return ojsonify(bookmark.to_dict()), 201
+
+
+@app.route('/api/bookmarks/bulk', methods=['POST'])
+def api_bulk_add_bookmarks():
+    data = request.get_json()
+    if not isinstance(data, list):
+        return ojsonify({"error": "a list of bookmarks is required"}), 400
+
+    items = []
+    for item in data:
+        error = bookmark_input_error(item)
+        if error:
+            return ojsonify({"error": error}), 400
+        items.append((item['url'], item['title'], clean_tag_names(item.get('tags', []))))
+
+    if not items:
+        return ojsonify({"count": 0, "results": []}), 201
+
+    # One multi-row INSERT per table and a single commit for the whole batch
+    try:
+        tags = get_or_create_tags(clean_tag_names(name for _, _, names in items for name in names))
+        # Store every tag with the spelling of its Tag row
+        row_tags = [[tags[name.lower()].name for name in names] for _, _, names in items]
+        rows = [{
+            "url": url,
+            "title": title,
+            "tags": ','.join(names),
+            "tags_json": orjson.dumps(names).decode()
+        } for (url, title, _), names in zip(items, row_tags)]
+        ids = db.session.scalars(
+            db.insert(Bookmark).returning(Bookmark.id, sort_by_parameter_order=True),
+            rows
+        ).all()
+        links = [{"bookmark_id": bookmark_id, "tag_id": tags[name.lower()].id}
+                 for bookmark_id, names in zip(ids, row_tags) for name in names]
+        if links:
+            db.session.execute(tag_assoc.insert(), links)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    results = [{"id": bookmark_id, "url": row["url"], "title": row["title"], "tags": names}
+               for bookmark_id, row, names in zip(ids, rows, row_tags)]
+    return ojsonify({"count": len(results), "results": results}), 201
 
 
 @app.route('/api/bookmarks/<int:bookmark_id>', methods=['PUT'])
 def api_update_bookmark(bookmark_id):
-    bookmark = Bookmark.query.get(bookmark_id)
+    bookmark = db.session.get(Bookmark, bookmark_id)
     if not bookmark:
-        return jsonify({"error": "Not found"}), 404
+        return ojsonify({"error": "Not found"}), 404
 
     data = request.get_json()
+    error = bookmark_input_error(data, partial=True)
+    if error:
+        return ojsonify({"error": error}), 400
+
     bookmark.url = data.get('url', bookmark.url)
     bookmark.title = data.get('title', bookmark.title)
     if 'tags' in data:
-        bookmark.tags = ','.join(data.get('tags', []))
+        set_bookmark_tags(bookmark, data.get('tags', []))
 
     db.session.commit()
-    return jsonify(bookmark.to_dict())
+    return ojsonify(bookmark.to_dict())
 
 
 @app.route('/api/bookmarks/<int:bookmark_id>', methods=['DELETE'])
 def api_delete_bookmark(bookmark_id):
-    bookmark = Bookmark.query.get(bookmark_id)
+    bookmark = db.session.get(Bookmark, bookmark_id)
     if not bookmark:
-        return jsonify({"error": "Not found"}), 404
+        return ojsonify({"error": "Not found"}), 404
     db.session.delete(bookmark)
     db.session.commit()
-    return jsonify({"message": "Deleted"})
+    return ojsonify({"message": "Deleted"})
 
 
 @app.route('/api/bookmarks/search', methods=['GET'])
+@conditional_on_data_version
 def api_search_bookmarks():
     tag = request.args.get('tag')
     title = request.args.get('title')
     q = request.args.get('q')
 
-    query = Bookmark.query
+    match = build_fts_query(title=title, q=q)
+    if match is None:
+        # A filter was given but contained nothing searchable
+        return ojsonify({"results": [], "count": 0})
 
+    params = {}
     if tag:
-        query = query.filter(Bookmark.tags.contains(tag))
-    if title:
-        query = query.filter(Bookmark.title.ilike(f'%{title}%'))
-    if q:
-        query = query.filter(
-            db.or_(
-                Bookmark.tags.ilike(f'%{q}%'),
-                Bookmark.title.ilike(f'%{q}%'),
-                Bookmark.url.ilike(f'%{q}%')
-            )
-        )
-
-    bookmarks = query.all()
-    return jsonify({
-        "count": len(bookmarks),
-        "results": [b.to_dict() for b in bookmarks]
-    })
+        params['tag'] = tag.strip()
+    if match:
+        params['q'] = match
+    statement = SEARCH_STATEMENTS[(bool(tag), bool(match))]
+
+    # Results are fetched and written out in batches, so an unfiltered search
+    # never holds the whole table in memory; the count follows the results
+    def generate():
+        result = db.session.execute(statement, params)
+        count = 0
+        yield b'{"results":['
+        for rows in result.partitions():
+            chunk = orjson.dumps(rows_to_dicts(rows))[1:-1]
+            yield b',' + chunk if count else chunk
+            count += len(rows)
+        yield b'],"count":' + str(count).encode() + b'}'
+
+    return app.response_class(stream_with_context(generate()), mimetype='application/json')
 
 
 @app.route('/api/tags', methods=['GET'])
+@conditional_on_data_version
 def api_get_tags():
-    bookmarks = Bookmark.query.all()
-    tag_count = {}
-    for bookmark in bookmarks:
-        if bookmark.tags:
-            for tag in bookmark.tags.split(','):
-                tag = tag.strip()
-                if tag:
-                    tag_count[tag] = tag_count.get(tag, 0) + 1
-
-    sorted_tags = sorted(tag_count.items(), key=lambda x: x[1], reverse=True)
-    return jsonify({
-        "total_tags": len(sorted_tags),
-        "tags": [{"name": tag, "count": count} for tag, count in sorted_tags]
-    })
+    return app.response_class(_tags_cache_entry()[2], mimetype='application/json')
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,18 @@
+import multiprocessing
+
+# One process per core, each serving requests on a pool of threads. SQLite
+# releases the GIL while a query runs, so threads overlap their reads.
+workers = multiprocessing.cpu_count()
+worker_class = 'gthread'
+threads = 8
+
+# Import the app (and run its table setup) once in the master before forking
+preload_app = True
+
+
+def post_fork(server, worker):
+    # Connections opened in the master during setup must not be shared with the
+    # children; each worker starts its own pool instead
+    from app import app, db
+    with app.app_context():
+        db.engine.dispose(close=False)
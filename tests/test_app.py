@@ -0,0 +1,236 @@
+import os
+import sys
+import threading
+
+import pytest
+from sqlalchemy import event, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def bookmarks_app(tmp_path_factory):
+    # The app sets up its tables at import, so point it at a temporary database first
+    db_path = tmp_path_factory.mktemp('db') / 'bookmarks.db'
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    import app
+    return app
+
+
+@pytest.fixture
+def client(bookmarks_app):
+    with bookmarks_app.app.app_context():
+        db = bookmarks_app.db
+        db.session.execute(text("DELETE FROM bookmark_tag"))
+        db.session.execute(text("DELETE FROM bookmark"))
+        db.session.execute(text("DELETE FROM tag"))
+        db.session.commit()
+    return bookmarks_app.app.test_client()
+
+
+def add_bookmark(client, title, tags=(), url='https://example.com'):
+    response = client.post('/api/bookmarks', json={"url": url, "title": title, "tags": list(tags)})
+    assert response.status_code == 201
+    return response.get_json()
+
+
+def count_queries(bookmarks_app, client, url):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with bookmarks_app.app.app_context():
+        engine = bookmarks_app.db.engine
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            assert client.get(url).status_code == 200
+        finally:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return len(statements)
+
+
+def search(client, query):
+    response = client.get('/api/bookmarks/search?' + query)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_list_query_count_does_not_grow_with_rows(bookmarks_app, client):
+    for i in range(3):
+        add_bookmark(client, f'Bookmark {i}', tags=['python', 'flask'])
+    few = count_queries(bookmarks_app, client, '/api/bookmarks')
+
+    bulk = [{"url": "https://example.com", "title": f"Bulk {i}", "tags": ["python"]}
+            for i in range(30)]
+    assert client.post('/api/bookmarks/bulk', json=bulk).status_code == 201
+    many = count_queries(bookmarks_app, client, '/api/bookmarks')
+
+    assert few == many == 2
+
+
+def test_search_matches_word_prefixes(client):
+    add_bookmark(client, 'React Native Docs', url='https://reactnative.dev')
+    add_bookmark(client, 'Flask Docs', url='https://flask.palletsprojects.com')
+
+    assert [r["title"] for r in search(client, 'q=reac')["results"]] == ['React Native Docs']
+    assert search(client, 'q=eact')["count"] == 0
+    assert search(client, 'title=native')["count"] == 1
+    assert search(client, 'q=docs')["count"] == 2
+
+
+def test_search_treats_operators_as_text(client):
+    add_bookmark(client, 'Flask Docs')
+
+    assert search(client, 'q=-')["count"] == 0
+    assert search(client, 'q=flask OR')["count"] == 0
+    assert search(client, 'q=flask"')["count"] == 1
+
+
+def test_tag_filter_is_exact_and_case_insensitive(client):
+    add_bookmark(client, 'Python Docs', tags=['python'])
+
+    assert search(client, 'tag=py')["count"] == 0
+    assert search(client, 'tag=PYTHON')["count"] == 1
+    assert search(client, 'tag=python&q=docs')["count"] == 1
+
+
+def test_tags_keep_the_first_spelling(client):
+    add_bookmark(client, 'One', tags=['Python'])
+    second = add_bookmark(client, 'Two', tags=['python', ' python '])
+    assert second["tags"] == ['Python']
+
+    updated = client.put(f'/api/bookmarks/{second["id"]}', json={"tags": ['PYTHON']})
+    assert updated.get_json()["tags"] == ['Python']
+    assert client.get('/api/tags').get_json() == {
+        "total_tags": 1,
+        "tags": [{"name": "Python", "count": 2}]
+    }
+
+
+def test_bulk_insert(client):
+    response = client.post('/api/bookmarks/bulk', json=[
+        {"url": "https://a.example", "title": "A", "tags": ["python", "web"]},
+        {"url": "https://b.example", "title": "B"},
+        {"url": "https://c.example", "title": "C", "tags": ["Web"]},
+    ])
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body["count"] == 3
+    assert [r["tags"] for r in body["results"]] == [["python", "web"], [], ["web"]]
+    assert search(client, 'tag=web')["count"] == 2
+
+
+@pytest.mark.parametrize('payload', [
+    {"bookmarks": []},
+    [{"url": "https://a.example"}],
+    [{"url": "https://a.example", "title": "A", "tags": None}],
+    [{"url": "https://a.example", "title": "A", "tags": [1]}],
+    [{"url": "https://a.example", "title": "A", "tags": "abc"}],
+    [{"url": "https://a.example", "title": ["x"]}],
+    [{"url": {"k": 1}, "title": "A"}],
+])
+def test_bulk_insert_rejects_invalid_items(client, payload):
+    assert client.post('/api/bookmarks/bulk', json=payload).status_code == 400
+    assert client.get('/api/bookmarks').get_json()["items"] == []
+
+
+@pytest.mark.parametrize('payload', [
+    {"url": "https://a.example"},
+    {"url": "https://a.example", "title": ["x"]},
+    {"url": "https://a.example", "title": "A", "tags": None},
+    {"url": "https://a.example", "title": "A", "tags": "abc"},
+])
+def test_add_rejects_invalid_bookmark(client, payload):
+    assert client.post('/api/bookmarks', json=payload).status_code == 400
+    assert client.get('/api/bookmarks').get_json()["items"] == []
+
+
+@pytest.mark.parametrize('payload', [
+    {"title": ["x"]},
+    {"url": ""},
+    {"tags": None},
+    {"tags": "abc"},
+])
+def test_update_rejects_invalid_fields(client, payload):
+    bookmark = add_bookmark(client, 'Keep', tags=['python'])
+    response = client.put(f'/api/bookmarks/{bookmark["id"]}', json=payload)
+    assert response.status_code == 400
+    assert client.get(f'/api/bookmarks/{bookmark["id"]}').get_json() == bookmark
+
+
+def test_pagination_follows_next(client):
+    ids = [add_bookmark(client, f'Bookmark {i}')["id"] for i in range(5)]
+
+    seen = []
+    after_id = 0
+    while True:
+        page = client.get(f'/api/bookmarks?limit=2&after_id={after_id}').get_json()
+        seen.extend(item["id"] for item in page["items"])
+        if page["next"] is None:
+            break
+        assert page["next"] == seen[-1]
+        after_id = page["next"]
+
+    assert seen == ids
+
+
+def test_pagination_clamps_after_id(client):
+    add_bookmark(client, 'Only')
+    response = client.get('/api/bookmarks?after_id=99999999999999999999')
+    assert response.status_code == 200
+    assert response.get_json() == {"items": [], "next": None}
+
+
+def test_conditional_get_until_write(client):
+    add_bookmark(client, 'First')
+    etag = client.get('/api/bookmarks').headers['ETag']
+
+    assert client.get('/api/bookmarks', headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/api/tags', headers={'If-None-Match': etag}).status_code == 200
+    assert client.get('/api/bookmarks?limit=1', headers={'If-None-Match': etag}).status_code == 200
+
+    add_bookmark(client, 'Second')
+    response = client.get('/api/bookmarks', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_missing_bookmark_is_404_with_matching_etag(client):
+    etag = client.get('/api/bookmarks').headers['ETag']
+    response = client.get('/api/bookmarks/999', headers={'If-None-Match': etag})
+    assert response.status_code == 404
+    assert 'ETag' not in response.headers
+
+
+def test_concurrent_requests_create_the_same_tag(bookmarks_app, client):
+    statuses = []
+
+    def post_bookmarks():
+        thread_client = bookmarks_app.app.test_client()
+        for i in range(10):
+            response = thread_client.post('/api/bookmarks', json={
+                "url": "https://example.com", "title": "Shared", "tags": ["shared", f"tag{i}"]
+            })
+            statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=post_bookmarks) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert statuses == [201] * 80
+    assert search(client, 'tag=shared')["count"] == 80
+
+
+def test_tag_with_comma_reads_the_same_everywhere(client):
+    created = add_bookmark(client, 'Comma', tags=['c,d', 'e'])
+    assert created["tags"] == ['c,d', 'e']
+
+    assert client.get(f'/api/bookmarks/{created["id"]}').get_json()["tags"] == ['c,d', 'e']
+    assert client.get('/api/bookmarks').get_json()["items"][0]["tags"] == ['c,d', 'e']
+    assert search(client, 'q=comma')["results"][0]["tags"] == ['c,d', 'e']
+    assert search(client, 'tag=c,d')["count"] == 1
+    assert search(client, 'tag=c')["count"] == 0
+    assert {tag["name"] for tag in client.get('/api/tags').get_json()["tags"]} == {'c,d', 'e'}
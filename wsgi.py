@@ -0,0 +1,3 @@
+from app import app
+
+# Production entry point, e.g. `gunicorn wsgi:app` (settings in gunicorn.conf.py)